@@ -325,7 +325,7 @@ def export_3d_bboxes(img_arr, image_w, image_h, fov, sensor_transform,
     image_h        : int   — camera height in pixels
     fov            : float — camera horizontal field of view in degrees
     sensor_transform : carla.Transform — camera world transform (from snapshot)
-    save_path      : str  — directory to write the _3dbbox.json file
+    save_path      : str  — existing directory to write the _3dbbox.json file
     actor_snapshot : dict — pre-fetched actor data built once per tick by the
                             main thread (see build_actor_snapshot()).
                             Keys are actor IDs; values are dicts with keys:
@@ -489,9 +489,8 @@ def export_3d_bboxes(img_arr, image_w, image_h, fov, sensor_transform,
             continue
 
     # --- Save to JSON ---
-    output_file = os.path.join(save_path, f"{timestamp}_3dbbox.json")
+    output_file = f"{save_path}{os.sep}{timestamp}_3dbbox.json"
     try:
-        os.makedirs(save_path, exist_ok=True)
         with open(output_file, 'w') as f:
             json.dump(output_data, f, separators=(',', ':'))
     except Exception as e:
@@ -0,0 +1,25 @@
+"""NumPy dtypes mirroring the raw_data layout of CARLA sensor measurements.
+
+Viewing raw_data through these with np.frombuffer gives whole-frame field
+access without iterating detections in Python.
+"""
+
+import numpy as np
+
+# carla::sensor::data::LidarDetection — (x, y, z, intensity) as float32.
+# A (4,) subarray dtype, so np.frombuffer yields an (N, 4) float32 array
+# directly, with no reshape step.
+LIDAR_DTYPE = np.dtype(('<f4', (4,)))
+
+# carla::sensor::data::SemanticLidarDetection
+SEMANTIC_LIDAR_DTYPE = np.dtype([
+    ('x', '<f4'), ('y', '<f4'), ('z', '<f4'),
+    ('cos_inc_angle', '<f4'),
+    ('object_idx', '<u4'), ('semantic_tag', '<u4'),
+])
+
+# carla::sensor::data::RadarDetection, in memory order.
+RADAR_DTYPE = np.dtype([
+    ('velocity', '<f4'), ('azimuth', '<f4'),
+    ('altitude', '<f4'), ('depth', '<f4'),
+])
@@ -68,24 +68,29 @@ def find_paired_instance_image(rgb_image_path, instance_folder):
     instance_path = Path(instance_folder) / f"{timestamp}.png"
     return str(instance_path) if instance_path.exists() else None
 
-def get_camera_config(camera_name, config):
-    """Get camera parameters from config file"""
-    for sensor in config["sensors"]:
-        if sensor["name"] == camera_name and sensor["type"] == "camera":
-            return {
-                "width": int(float(sensor["attributes"]["image_size_x"])),
-                "height": int(float(sensor["attributes"]["image_size_y"])),
-                "fov": float(sensor["attributes"].get("fov", 90)) 
-            }
-    return None
+def get_camera_config(camera_name, sensors_by_name):
+    """Get camera parameters from the {name: sensor} config lookup"""
+    sensor = sensors_by_name.get(camera_name)
+    if sensor is None or sensor["type"] != "camera":
+        return None
+    return {
+        "width": int(float(sensor["attributes"]["image_size_x"])),
+        "height": int(float(sensor["attributes"]["image_size_y"])),
+        "fov": float(sensor["attributes"].get("fov", 90)) 
+    }
 
-def process_scene(scene_path):
-    """Process all RGB cameras in a scene that have instance segmentation pairs"""
-    # Load config file to get camera parameters
-    with open(ROOT / 'config.yml', 'r') as f:
-        config = yaml.safe_load(f)
+def process_scene(scene_path, config=None):
+    """Process all RGB cameras in a scene that have instance segmentation pairs.
+
+    config is the parsed config.yml; when omitted it is read from disk, so
+    callers looping over many scenes should parse it once and pass it in.
+    """
+    if config is None:
+        with open(ROOT / 'config.yml', 'r') as f:
+            config = yaml.safe_load(f)
     
     print(f"Processing scene: {scene_path}")
+    sensors_by_name = {sensor["name"]: sensor for sensor in config["sensors"]}
     
     # Get all camera folders by checking config
     camera_folders = []
@@ -103,7 +108,7 @@ def process_scene(scene_path):
         instance_folder = os.path.join(scene_path, f"instance_{camera_name}")
         
         # Get camera configuration
-        camera_config = get_camera_config(camera_name, config)
+        camera_config = get_camera_config(camera_name, sensors_by_name)
         if not camera_config:
             print(f"Warning: No configuration found for camera {camera_name}")
             continue
@@ -141,7 +146,7 @@ def process_scene(scene_path):
                 
                 json_path = os.path.join(camera_folder, f"{timestamp}_bbox.json")
                 with open(json_path, 'w') as f:
-                    json.dump(bbox_data, f, indent=2)
+                    json.dump(bbox_data, f, separators=(',', ':'))
                 processed += 1
                 
             except Exception as e:
@@ -155,7 +160,7 @@ def main():
     
     scene_dirs = sorted(glob.glob(os.path.join(base_save_path, "scene_*")))
     for scene_dir in scene_dirs:
-        process_scene(scene_dir)
+        process_scene(scene_dir, config)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
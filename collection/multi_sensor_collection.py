@@ -7,16 +7,18 @@ import subprocess
 import sys
 import glob
 from pathlib import Path
+from functools import partial
 from queue import Queue, Empty
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 
 ROOT = Path(__file__).resolve().parent.parent  # MUSE_Carla/
 sys.path.insert(0, str(Path(__file__).resolve().parent))
 
 from bounding_box_export import export_3d_bboxes, get_static_vehicle_env_objects
 from traffic_setup import setup_traffic, spawn_ego_vehicle
-from sensor_processing import process_sensor_config, sensor_callback, write_sensor_data, clean_scene_data
-from simulation_logic import create_scene_folders
+from sensor_processing import (process_sensor_config, sensor_callback, write_sensor_data,
+                               write_sensor_batch, clean_scene_data)
+from simulation_logic import create_scene_folders, tick_world
 from generate_bbox_annotations import process_scene
 
 EGO_POSE_FOLDER = "ego_pose"
@@ -42,14 +44,21 @@ def _next_scene_id(base_save_path: str) -> int:
     return max(existing) + 1 if existing else 1
 
 # Worker threads for file I/O.  All data passed to workers is plain Python /
-# NumPy — no CARLA C++ objects — so thread count can be higher.
-IO_WORKERS = 8
+# NumPy — no CARLA C++ objects — so thread count can be higher.  PNG encoding
+# in cv2.imwrite releases the GIL, so the pool scales with the CPU count.
+IO_WORKERS = max(8, os.cpu_count() or 1)
 
 # Maximum number of futures allowed in-flight before we block world.tick().
 # Prevents unbounded memory growth when I/O is slower than sensor tick rate.
 # At 10 Hz with ~16 sensors/tick each frame is ~2 MB; 32 pending = ~64 MB max.
 MAX_PENDING_FUTURES = 32
 
+# IMU / GNSS frames are a few hundred bytes of JSON each.  They are grouped
+# and handed to the executor once every JSON_BATCH_TICKS ticks instead of
+# one job per frame.
+SMALL_PAYLOAD_KINDS = ('imu', 'gnss')
+JSON_BATCH_TICKS = 10
+
 
 def build_actor_static_cache(world, ego_id):
     """Fetch static actor metadata once per scene (type_id + bounding_box).
@@ -129,11 +138,18 @@ def save_ego_pose(transform, timestamp, ego_pose_dir):
             "pitch": transform['pitch'], "yaw": transform['yaw'], "roll": transform['roll']
         }
     }
-    pose_path = os.path.join(ego_pose_dir, f"{timestamp}.json")
+    pose_path = f"{ego_pose_dir}{os.sep}{timestamp}.json"
     with open(pose_path, 'w') as f:
         json.dump(pose, f, separators=(',', ':'))
 
 
+def _report_pose_error(future):
+    """Done-callback for save_ego_pose jobs: nothing reads their result, so
+    print the failure here instead of losing it inside the future."""
+    if not future.cancelled() and future.exception() is not None:
+        print(f"Error saving ego pose: {future.exception()}")
+
+
 def generate_map_mask(base_save_path):
     """Generate map mask using the external generate_map_mask.py script."""
     print("\n" + "="*60)
@@ -192,7 +208,7 @@ def collect_log_info(world, ego_vehicle, base_save_path):
     }
     log_info_path = os.path.join(base_save_path, LOG_INFO_FILENAME)
     with open(log_info_path, 'w') as f:
-        json.dump(log_info, f, indent=2)
+        json.dump(log_info, f, separators=(',', ':'))
 
 
 def main():
@@ -221,9 +237,12 @@ def main():
         seconds_per_scene = sim_config["seconds_per_scene"]
         ticks_per_scene  = int(seconds_per_scene * frequency_hz)
         base_save_path   = sim_config["base_save_path"]
+        # Per-tick progress lines are opt-in; stdout is piped by the GUI.
+        verbose          = bool(sim_config.get("verbose", False))
 
-        # Build a static blueprint_id map so listeners never re-read config.yml
-        blueprint_id_map = {s["name"]: s["blueprint"] for s in sensors_config}
+        # Sensor configs keyed by name, built once so nothing re-reads
+        # config.yml or re-scans the sensor list per scene or per frame.
+        sensor_cfg_by_name = {s["name"]: s for s in sensors_config}
 
         client = carla.Client('localhost', 2000)
         client.set_timeout(20.0)
@@ -246,12 +265,30 @@ def main():
 
         print("Letting traffic settle...")
         settle_ticks = max(1, int(round(2.5 * frequency_hz)))
-        for _ in range(settle_ticks):
-            world.tick()
+        tick_world(world, settle_ticks)
 
         traffic_manager = client.get_trafficmanager(8000)
         traffic_manager.set_synchronous_mode(True)
 
+        # Sensor blueprints (attributes applied) and mount transforms are
+        # built once here and reused for every scene attempt.
+        blueprint_library = world.get_blueprint_library()
+        ego_spawn_points  = world.get_map().get_spawn_points()
+        prepared_sensors = []
+        for sensor_cfg in sensors_config:
+            bp_sensor = blueprint_library.find(sensor_cfg["blueprint"])
+            for attr, value in sensor_cfg["attributes"].items():
+                bp_sensor.set_attribute(attr, value)
+            loc = sensor_cfg["transform"]["location"]
+            rot = sensor_cfg["transform"]["rotation"]
+            transform = carla.Transform(
+                carla.Location(x=loc["x"], y=loc["y"], z=loc["z"]),
+                carla.Rotation(pitch=rot.get("pitch", 0),
+                               yaw=rot["yaw"],
+                               roll=rot.get("roll", 0))
+            )
+            prepared_sensors.append((sensor_cfg["name"], bp_sensor, transform))
+
         scene_paths = []
         log_info_collected = False
 
@@ -278,14 +315,18 @@ def main():
                 done_queue = Queue()
 
                 try:
-                    sensor_names = [s["name"] for s in sensors_config]
+                    sensor_names = list(sensor_cfg_by_name)
                     save_path    = create_scene_folders(scene_id, sensor_names, base_save_path)
                     scene_paths.append(save_path)
-                    blueprint_library = world.get_blueprint_library()
+                    # Per-sensor output folders, joined once per scene and
+                    # captured by the listeners instead of per frame.
+                    sensor_folders = {name: os.path.join(save_path, name)
+                                      for name in sensor_names}
 
                     print(f"\nScene {scene_id} - Attempt {scene_retry + 1}/{max_scene_retries}")
                     try:
-                        vehicle = spawn_ego_vehicle(world, blueprint_library, traffic_manager)
+                        vehicle = spawn_ego_vehicle(world, blueprint_library, traffic_manager,
+                                                    spawn_points=ego_spawn_points)
                     except RuntimeError as e:
                         print(f"Failed to spawn ego vehicle: {e}")
                         if scene_retry < max_scene_retries - 1:
@@ -297,8 +338,7 @@ def main():
 
                     print("Ego vehicle spawned, stabilising...")
                     stabilize_ticks = max(1, int(round(1.0 * frequency_hz)))
-                    for _ in range(stabilize_ticks):
-                        world.tick()
+                    tick_world(world, stabilize_ticks)
 
                     if not log_info_collected:
                         collect_log_info(world, vehicle, base_save_path)
@@ -313,41 +353,41 @@ def main():
                     # never opens config.yml.
                     # actor_snapshot / ego_transform are mutable containers so
                     # the tick loop can update them in-place and the callback
-                    # closure always sees the latest value.
+                    # always sees the latest value.
                     # --------------------------------------------------------
-                    # We use a list-of-one as a mutable reference so the lambda
-                    # captures the container, not a frozen value.
+                    # We use a list-of-one as a mutable reference so the bound
+                    # partial holds the container, not a frozen value.
                     snapshot_ref    = [{}]   # snapshot_ref[0] = current actor snapshot
                     ego_tf_ref      = [None] # ego_tf_ref[0]   = current ego transform
 
-                    for sensor_cfg in sensors_config:
-                        bp_sensor = blueprint_library.find(sensor_cfg["blueprint"])
-                        for attr, value in sensor_cfg["attributes"].items():
-                            bp_sensor.set_attribute(attr, value)
-                        loc = sensor_cfg["transform"]["location"]
-                        rot = sensor_cfg["transform"]["rotation"]
-                        transform = carla.Transform(
-                            carla.Location(x=loc["x"], y=loc["y"], z=loc["z"]),
-                            carla.Rotation(pitch=rot.get("pitch", 0),
-                                           yaw=rot["yaw"],
-                                           roll=rot.get("roll", 0))
-                        )
-                        actor = world.spawn_actor(bp_sensor, transform, attach_to=vehicle)
-                        sensor_list.append(actor)
-
-                        _name    = sensor_cfg["name"]
-                        _bp_id   = blueprint_id_map[_name]
-                        actor.listen(
-                            lambda data,
-                                   q=raw_queue,
-                                   name=_name,
-                                   path=save_path,
-                                   bp=_bp_id,
-                                   snap_ref=snapshot_ref,
-                                   etf_ref=ego_tf_ref:
-                            sensor_callback(data, q, name, path, bp,
-                                            snap_ref[0], etf_ref[0])
-                        )
+                    # Spawn every sensor in one batch round-trip (no tick),
+                    # then attach the listeners in a second pass.
+                    responses = client.apply_batch_sync([
+                        carla.command.SpawnActor(bp_sensor, transform, vehicle.id)
+                        for _, bp_sensor, transform in prepared_sensors
+                    ])
+                    spawned_ids = [r.actor_id for r in responses if not r.error]
+                    actors_by_id = ({a.id: a for a in world.get_actors(spawned_ids)}
+                                    if spawned_ids else {})
+                    sensor_list.extend(actors_by_id.values())
+                    failed = [(name, r.error) for (name, _, _), r
+                              in zip(prepared_sensors, responses) if r.error]
+                    if failed:
+                        # sensor_list already holds the spawned ones for cleanup.
+                        raise RuntimeError(f"Failed to spawn sensors: {failed}")
+
+                    for (_name, _, _), response in zip(prepared_sensors, responses):
+                        actor  = actors_by_id[response.actor_id]
+                        _bp_id = sensor_cfg_by_name[_name]["blueprint"]
+                        actor.listen(partial(
+                            sensor_callback,
+                            sensor_queue=raw_queue,
+                            sensor_name=_name,
+                            sensor_folder=sensor_folders[_name],
+                            blueprint_id=_bp_id,
+                            snapshot_ref=snapshot_ref,
+                            ego_tf_ref=ego_tf_ref,
+                        ))
 
                     # --------------------------------------------------------
                     # Warm-up ticks — discard data, let sensors stabilise.
@@ -357,7 +397,7 @@ def main():
                     for _ in range(WARMUP_TICKS):
                         world.tick()
                         # Drain any warm-up frames so the queue stays empty
-                        while not raw_queue.empty():
+                        while True:
                             try:
                                 raw_queue.get_nowait()
                             except Empty:
@@ -368,7 +408,7 @@ def main():
                     # Per tick:
                     #   1. world.tick()  — advance simulation, callbacks fire
                     #   2. Build actor snapshot from world_snapshot (zero RPC)
-                    #   3. Save ego pose (main thread, blocking but tiny)
+                    #   3. Submit the ego pose write to the executor
                     #   4. Drain raw_queue — submit each frame to the executor
                     # --------------------------------------------------------
                     print(f"\nStarting data collection for scene {scene_id}...")
@@ -381,6 +421,9 @@ def main():
                     print(f"Actor cache built: {len(actor_static_cache)} NPC actors")
 
                     pending_futures = []
+                    small_batch     = []
+                    # Progress shown ~20 times per scene rather than every 10 ticks
+                    progress_every  = max(1, ticks_per_scene // 20)
 
                     for tick in range(ticks_per_scene):
                         # --------------------------------------------------------
@@ -425,29 +468,46 @@ def main():
                         snapshot_ref[0] = actor_snap
                         ego_tf_ref[0]   = ego_transform
 
-                        # Ego pose — directory already created above.
-                        save_ego_pose(ego_transform, timestamp, ego_pose_dir)
+                        # Ego pose — directory already created above.  Written on
+                        # the executor like sensor frames so the tick loop never
+                        # blocks on disk.
+                        f = executor.submit(
+                            save_ego_pose, ego_transform, timestamp, ego_pose_dir)
+                        f.add_done_callback(_report_pose_error)
+                        pending_futures.append(f)
 
                         # Drain raw sensor queue — submit writes to executor.
                         drained = 0
-                        while not raw_queue.empty():
+                        while True:
                             try:
                                 item = raw_queue.get_nowait()
                             except Empty:
                                 break
-                            (s_payload, s_ts, s_name, s_path,
+                            drained += 1
+                            if item[0][0] in SMALL_PAYLOAD_KINDS:
+                                small_batch.append(item)
+                                continue
+                            (s_payload, s_ts, s_name, s_folder,
                              s_bp, s_snap, s_etf) = item
                             f = executor.submit(
                                 write_sensor_data,
-                                s_payload, s_ts, s_name, s_path, s_bp,
+                                s_payload, s_ts, s_name, s_folder, s_bp,
                                 s_snap, s_etf,
                                 static_vehicles, done_queue
                             )
                             pending_futures.append(f)
-                            drained += 1
+
+                        if small_batch and (tick + 1) % JSON_BATCH_TICKS == 0:
+                            pending_futures.append(executor.submit(
+                                write_sensor_batch, small_batch,
+                                static_vehicles, done_queue))
+                            small_batch = []
 
                         if tick % 10 == 0:
                             pending_futures = [f for f in pending_futures if not f.done()]
+
+                        if verbose and (tick % progress_every == 0
+                                        or tick == ticks_per_scene - 1):
                             print(f"  Tick {tick + 1}/{ticks_per_scene} "
                                   f"— queued {drained} frames, "
                                   f"{len(pending_futures)} futures pending")
@@ -456,6 +516,10 @@ def main():
                     # Scene done — wait for all worker writes to finish.
                     # --------------------------------------------------------
                     print("Flushing I/O workers...")
+                    if small_batch:
+                        pending_futures.append(executor.submit(
+                            write_sensor_batch, small_batch,
+                            static_vehicles, done_queue))
                     executor.shutdown(wait=True)
                     print(f"Scene {scene_id} complete — all frames written.")
 
@@ -504,10 +568,10 @@ def main():
                         pass
 
                     # Step 3 — drain raw_queue (discard; scene is ending).
-                    while not raw_queue.empty():
+                    while True:
                         try:
                             raw_queue.get_nowait()
-                        except Exception:
+                        except Empty:
                             break
 
                     # Step 4 — wait for all I/O workers to finish.
@@ -552,24 +616,33 @@ def main():
                 # Let the server settle between scenes before spawning new actors.
                 print("Letting server settle before next scene...")
                 settle_between = max(1, int(round(1.0 * frequency_hz)))
-                for _ in range(settle_between):
-                    try:
-                        world.tick()
-                    except Exception:
-                        break
+                try:
+                    tick_world(world, settle_between)
+                except Exception:
+                    pass
 
         # ------------------------------------------------------------------
         # Post-collection: clean up partial frames, then run 2D bbox annotation
         # (only for cameras with collect_bbox: true — default is false).
         # ------------------------------------------------------------------
+        # A retried scene is appended once per attempt; handle each folder once.
+        scene_paths = list(dict.fromkeys(scene_paths))
         for path in scene_paths:
             print(f"Cleaning scene data: {path}")
             sensors_for_cleanup = list(sensor_names) + [EGO_POSE_FOLDER]
             clean_scene_data(path, sensors_for_cleanup)
         print("All scenes cleaned.")
 
-        for path in scene_paths:
-            process_scene(path)
+        # Scenes are independent and the annotation pass is CPU-bound, so
+        # several scenes are processed in parallel worker processes.
+        if len(scene_paths) > 1:
+            workers = min(len(scene_paths), os.cpu_count() or 1)
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(process_scene, scene_paths,
+                              [config] * len(scene_paths)))
+        else:
+            for path in scene_paths:
+                process_scene(path, config)
 
         _collection_ok = True  # all scenes done, post-processing complete
 
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+"""Convert semantic LiDAR .npy frames to binary PLY for external viewers.
+
+Collection only stores the structured NumPy arrays; run this offline when a
+PLY copy is needed, e.g.
+
+    python collection/npy_to_ply.py data/_out/scene_1/Semantic_Lidar
+"""
+
+import sys
+import argparse
+from pathlib import Path
+import numpy as np
+
+# NumPy dtype kind/size -> PLY scalar type name.
+_PLY_TYPES = {
+    ('f', 4): 'float', ('f', 8): 'double',
+    ('u', 1): 'uchar', ('u', 2): 'ushort', ('u', 4): 'uint',
+    ('i', 1): 'char', ('i', 2): 'short', ('i', 4): 'int',
+}
+
+
+def write_ply(points, path):
+    """Write a structured point array as a binary little-endian PLY."""
+    fields = points.dtype.names
+    if not fields:
+        raise ValueError("expected a structured array with named fields")
+    le_dtype = np.dtype([(name, points.dtype[name].newbyteorder('<')) for name in fields])
+    header = ["ply", "format binary_little_endian 1.0", f"element vertex {len(points)}"]
+    for name in fields:
+        ftype = points.dtype[name]
+        header.append(f"property {_PLY_TYPES[(ftype.kind, ftype.itemsize)]} {name}")
+    header.append("end_header")
+    with open(path, 'wb') as f:
+        f.write(('\n'.join(header) + '\n').encode('ascii'))
+        f.write(np.ascontiguousarray(points, dtype=le_dtype).tobytes())
+
+
+def convert_folder(folder, output=None):
+    """Convert every <timestamp>.npy in folder; returns the number written."""
+    folder = Path(folder)
+    output = Path(output) if output else folder
+    output.mkdir(parents=True, exist_ok=True)
+    converted = 0
+    for npy_file in sorted(folder.glob('*.npy')):
+        points = np.load(npy_file)
+        if not points.dtype.names:
+            print(f"Skipping {npy_file.name}: not a structured point cloud")
+            continue
+        write_ply(points, output / f"{npy_file.stem}.ply")
+        converted += 1
+    return converted
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert semantic LiDAR .npy frames to binary PLY')
+    parser.add_argument('folder', help='Sensor folder containing <timestamp>.npy files')
+    parser.add_argument('--output', default=None, help='Output folder (default: alongside the .npy files)')
+    args = parser.parse_args()
+
+    if not Path(args.folder).is_dir():
+        print(f"Folder not found: {args.folder}")
+        sys.exit(1)
+    count = convert_folder(args.folder, args.output)
+    print(f"Wrote {count} PLY files")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,24 +1,68 @@
 import os
+import io
 import json
 import math
+import struct
 import numpy as np
+import cv2
 import carla
 from pathlib import Path
-from PIL import Image as PilImage
-import io
+from concurrent.futures import ThreadPoolExecutor
 
 ROOT = Path(__file__).resolve().parent.parent  # MUSE_Carla/
 
+# PNG stays lossless, so segmentation tags and the NuScenes JPEG export are
+# unaffected; zlib level 1 encodes several times faster than the default 6
+# for slightly larger files.
+PNG_WRITE_PARAMS = [cv2.IMWRITE_PNG_COMPRESSION, 1]
+
+# Threads used by clean_scene_data to delete unsynchronised files.
+CLEANUP_WORKERS = 16
+
+# Point clouds get their .npy header padded so the data starts on a page
+# boundary, which suits mmap / O_DIRECT readers during training.
+NPY_HEADER_ALIGN = 4096
+
+
+def _npy_header(arr, align=None):
+    """Return the .npy 1.0 header for arr, optionally padded to `align` bytes."""
+    buf = io.BytesIO()
+    np.lib.format.write_array_header_1_0(
+        buf, np.lib.format.header_data_from_array_1_0(arr))
+    header = buf.getvalue()
+    pad = -len(header) % align if align else 0
+    if pad:
+        # The format allows trailing spaces before the closing newline;
+        # bytes 8-9 hold the little-endian header length.
+        header = header[:-1] + b' ' * pad + b'\n'
+        header = header[:8] + struct.pack('<H', len(header) - 10) + header[10:]
+    return header
+
+
+def _save_npy(path, arr, align=None):
+    """Write a C-contiguous array as a .npy file readable by np.load.
+
+    Writes the 1.0 header directly and then the array buffer, skipping
+    np.save's path handling, version negotiation and the tobytes() copy."""
+    arr = np.ascontiguousarray(arr)
+    with open(path, 'wb') as f:
+        f.write(_npy_header(arr, align))
+        f.write(arr.data)
+
 from bounding_box_export import export_3d_bboxes, get_static_vehicle_env_objects
+from carla_dtypes import LIDAR_DTYPE, SEMANTIC_LIDAR_DTYPE, RADAR_DTYPE
 
 def calculate_radar_intensity(depth):
-    """Calcule l'intensité du signal radar."""
+    """Calcule l'intensité du signal radar pour un tableau de profondeurs.
+
+    Pas de bruit additif : un plancher de 1e-9 est bien en dessous de la
+    précision float32 du signal enregistré.  Une profondeur nulle est
+    ramenée à min_depth pour rester finie ; le replay sature ces valeurs."""
     rcs = 10          # Section efficace radar moyenne (m²)
-    noise_floor = 1e-9
     ref_distance = 10 # Distance de référence (m)
-    intensity = (ref_distance / depth) ** 4 * rcs
-    noise = np.random.normal(0, noise_floor)
-    return max(intensity + noise, 0)
+    min_depth = 1e-3  # Profondeur minimale (m) : évite inf pour depth == 0
+    depth = np.maximum(np.asarray(depth, dtype=np.float64), min_depth)
+    return (ref_distance / depth) ** 4 * rcs
 
 def process_sensor_config(sensors_config):
     """Process sensor configuration and automatically add instance segmentation cameras.
@@ -79,20 +123,57 @@ _CITYSCAPES_PALETTE = {
     28: (180, 165, 180),  # GuardRail
 }
 
+# 256-entry lookup table indexed by semantic tag, stored BGR so the result
+# goes straight to cv2.imwrite.  Tags outside the palette map to black.
+_CITYSCAPES_LUT_BGR = np.zeros((256, 3), dtype=np.uint8)
+for _tag, (_r, _g, _b) in _CITYSCAPES_PALETTE.items():
+    _CITYSCAPES_LUT_BGR[_tag] = (_b, _g, _r)
+
+
 def _apply_cityscapes_palette(raw_rgba: np.ndarray) -> np.ndarray:
-    """Convert CARLA semantic image (BGRA, R=tag) to CityScapes RGB palette.
+    """Convert CARLA semantic image (BGRA, R=tag) to CityScapes colours.
 
     raw_rgba shape: (H, W, 4), dtype uint8, channel order BGRA.
     CARLA encodes the semantic tag in the Red channel.
-    Returns (H, W, 3) uint8 RGB.
+    Returns (H, W, 3) uint8 BGR, ready for cv2.imwrite.
     """
-    tags = raw_rgba[:, :, 2]  # R channel in BGRA layout
-    h, w = tags.shape
-    out = np.zeros((h, w, 3), dtype=np.uint8)
-    for tag, color in _CITYSCAPES_PALETTE.items():
-        mask = tags == tag
-        out[mask] = color
-    return out
+    return _CITYSCAPES_LUT_BGR[raw_rgba[:, :, 2]]
+
+
+# Fixed-schema IMU / GNSS encoders.  For finite values the output is byte-for-
+# byte what json.dumps(..., separators=(',', ':')) produces (both use
+# float.__repr__), without walking nested dicts for every frame.
+_IMU_JSON = ('{{"timestamp":{},'
+             '"accelerometer":{{"x":{!r},"y":{!r},"z":{!r}}},'
+             '"gyroscope":{{"x":{!r},"y":{!r},"z":{!r}}},'
+             '"compass":{!r}}}')
+_GNSS_JSON = '{{"timestamp":{},"latitude":{!r},"longitude":{!r},"altitude":{!r}}}'
+
+
+def _encode_imu(timestamp, values):
+    """Serialise (ax, ay, az, gx, gy, gz, compass) to the IMU JSON schema."""
+    if all(map(math.isfinite, values)):
+        return _IMU_JSON.format(timestamp, *values)
+    ax, ay, az, gx, gy, gz, compass = values
+    return json.dumps({
+        "timestamp": timestamp,
+        "accelerometer": {"x": ax, "y": ay, "z": az},
+        "gyroscope": {"x": gx, "y": gy, "z": gz},
+        "compass": compass,
+    }, separators=(',', ':'))
+
+
+def _encode_gnss(timestamp, values):
+    """Serialise (latitude, longitude, altitude) to the GNSS JSON schema."""
+    if all(map(math.isfinite, values)):
+        return _GNSS_JSON.format(timestamp, *values)
+    latitude, longitude, altitude = values
+    return json.dumps({
+        "timestamp": timestamp,
+        "latitude": latitude,
+        "longitude": longitude,
+        "altitude": altitude,
+    }, separators=(',', ':'))
 
 
 # ---------------------------------------------------------------------------
@@ -102,75 +183,79 @@ def _apply_cityscapes_palette(raw_rgba: np.ndarray) -> np.ndarray:
 # NEVER call sensor_data.save_to_disk() from worker threads — it is not
 # thread-safe and causes a C++ crash in the CARLA server.
 # ---------------------------------------------------------------------------
-def sensor_callback(sensor_data, sensor_queue, sensor_name, save_path,
-                    blueprint_id, actor_snapshot, ego_transform):
-    """Lightweight callback: copy raw bytes then enqueue for the I/O pool."""
-    try:
-        timestamp = int(sensor_data.timestamp * 1e3)
+def _image_payload(sensor_data):
+    # Copy BGRA pixels into a numpy array NOW, on the CARLA thread.
+    # After the callback returns, CARLA may reuse the buffer.
+    arr = np.frombuffer(sensor_data.raw_data, dtype=np.uint8).copy()
+    arr = arr.reshape((sensor_data.height, sensor_data.width, 4))
+    # Serialize sensor_transform to plain Python — carla C++ objects
+    # must NOT be accessed from worker threads.
+    st = sensor_data.transform
+    sensor_tf = {
+        'x': st.location.x, 'y': st.location.y, 'z': st.location.z,
+        'pitch': st.rotation.pitch, 'yaw': st.rotation.yaw, 'roll': st.rotation.roll,
+        'matrix': [list(row) for row in st.get_matrix()],
+    }
+    return ('image', arr, sensor_data.width, sensor_data.height,
+            sensor_data.fov, sensor_tf)
+
+
+def _semantic_lidar_payload(sensor_data):
+    # Copy structured point cloud bytes.
+    return ('semantic_lidar', bytes(sensor_data.raw_data))
+
+
+def _lidar_payload(sensor_data):
+    pts = np.frombuffer(sensor_data.raw_data, dtype=LIDAR_DTYPE).copy()
+    return ('lidar', pts)
+
+
+def _radar_payload(sensor_data):
+    # One record per detection, fields named after RadarDetection.
+    raw = np.frombuffer(sensor_data.raw_data, dtype=RADAR_DTYPE).copy()
+    return ('radar', raw)
+
+
+def _imu_payload(sensor_data):
+    acc, gyro = sensor_data.accelerometer, sensor_data.gyroscope
+    return ('imu', (acc.x, acc.y, acc.z,
+                    gyro.x, gyro.y, gyro.z,
+                    sensor_data.compass))
+
+
+def _gnss_payload(sensor_data):
+    return ('gnss', (sensor_data.latitude,
+                     sensor_data.longitude,
+                     sensor_data.altitude))
+
+
+# Exact measurement type -> payload builder; one dict lookup per callback
+# instead of walking an isinstance chain.
+_PAYLOAD_BUILDERS = {
+    carla.Image:                    _image_payload,
+    carla.SemanticLidarMeasurement: _semantic_lidar_payload,
+    carla.LidarMeasurement:         _lidar_payload,
+    carla.RadarMeasurement:         _radar_payload,
+    carla.IMUMeasurement:           _imu_payload,
+    carla.GnssMeasurement:          _gnss_payload,
+}
+
 
-        if isinstance(sensor_data, carla.Image):
-            # Copy BGRA pixels into a numpy array NOW, on the CARLA thread.
-            # After this function returns, CARLA may reuse the buffer.
-            arr = np.frombuffer(sensor_data.raw_data, dtype=np.uint8).copy()
-            arr = arr.reshape((sensor_data.height, sensor_data.width, 4))
-            # Serialize sensor_transform to plain Python — carla C++ objects
-            # must NOT be accessed from worker threads.
-            st = sensor_data.transform
-            sensor_tf = {
-                'x': st.location.x, 'y': st.location.y, 'z': st.location.z,
-                'pitch': st.rotation.pitch, 'yaw': st.rotation.yaw, 'roll': st.rotation.roll,
-                'matrix': [list(row) for row in st.get_matrix()],
-            }
-            payload = ('image', arr, sensor_data.width, sensor_data.height,
-                       sensor_data.fov, sensor_tf)
-
-        elif isinstance(sensor_data, carla.SemanticLidarMeasurement):
-            # Copy structured point cloud bytes.
-            raw = bytes(sensor_data.raw_data)
-            payload = ('semantic_lidar', raw)
-
-        elif isinstance(sensor_data, carla.LidarMeasurement):
-            raw = np.frombuffer(sensor_data.raw_data, dtype=np.float32).copy()
-            payload = ('lidar', raw)
-
-        elif isinstance(sensor_data, carla.RadarMeasurement):
-            pts = []
-            for detect in sensor_data:
-                azi = math.degrees(detect.azimuth)
-                alt = math.degrees(detect.altitude)
-                intensity = calculate_radar_intensity(detect.depth)
-                pts.append([detect.depth, alt, azi, detect.velocity, intensity])
-            payload = ('radar', pts)
-
-        elif isinstance(sensor_data, carla.IMUMeasurement):
-            payload = ('imu', {
-                "timestamp": timestamp,
-                "accelerometer": {
-                    "x": sensor_data.accelerometer.x,
-                    "y": sensor_data.accelerometer.y,
-                    "z": sensor_data.accelerometer.z,
-                },
-                "gyroscope": {
-                    "x": sensor_data.gyroscope.x,
-                    "y": sensor_data.gyroscope.y,
-                    "z": sensor_data.gyroscope.z,
-                },
-                "compass": sensor_data.compass,
-            })
-
-        elif isinstance(sensor_data, carla.GnssMeasurement):
-            payload = ('gnss', {
-                "timestamp": timestamp,
-                "latitude":  sensor_data.latitude,
-                "longitude": sensor_data.longitude,
-                "altitude":  sensor_data.altitude,
-            })
-
-        else:
+def sensor_callback(sensor_data, sensor_queue, sensor_name, sensor_folder,
+                    blueprint_id, snapshot_ref, ego_tf_ref):
+    """Lightweight callback: copy raw bytes then enqueue for the I/O pool.
+
+    snapshot_ref / ego_tf_ref are one-element lists updated by the tick loop;
+    they are read here so each frame is queued with the current values."""
+    try:
+        build_payload = _PAYLOAD_BUILDERS.get(type(sensor_data))
+        if build_payload is None:
             return  # unknown sensor type — drop
 
-        sensor_queue.put((payload, timestamp, sensor_name, save_path,
-                          blueprint_id, actor_snapshot, ego_transform))
+        timestamp = int(sensor_data.timestamp * 1e3)
+        payload = build_payload(sensor_data)
+        sensor_queue.put((payload, timestamp, sensor_name, sensor_folder,
+                          blueprint_id, snapshot_ref[0], ego_tf_ref[0]))
     except Exception as e:
         print(f"Error queuing sensor data for {sensor_name}: {e}")
 
@@ -179,26 +264,31 @@ def sensor_callback(sensor_data, sensor_queue, sensor_name, save_path,
 # Worker function — called by the ThreadPoolExecutor on a worker thread.
 # Receives only plain Python / NumPy data — zero CARLA client calls here.
 # ---------------------------------------------------------------------------
-def write_sensor_data(payload_tuple, timestamp, sensor_name, save_path,
+def write_sensor_data(payload_tuple, timestamp, sensor_name, sensor_folder,
                       blueprint_id, actor_snapshot, ego_transform,
                       static_vehicles, done_queue):
     """Serialise one sensor frame to disk.  Runs on an executor worker thread.
     No CARLA client calls allowed here — not thread-safe."""
     try:
-        sensor_folder = os.path.join(save_path, sensor_name)
         kind = payload_tuple[0]
+        # Folder is already a joined, known-good path: plain concatenation
+        # is enough for the per-frame file names.
+        stem = f"{sensor_folder}{os.sep}{timestamp}"
 
         if kind == 'image':
             _, arr, width, height, fov, transform = payload_tuple
-            img_path = os.path.join(sensor_folder, f"{timestamp}.png")
+            img_path = f"{stem}.png"
 
             if blueprint_id == "sensor.camera.semantic_segmentation":
-                rgb = _apply_cityscapes_palette(arr)
-                PilImage.fromarray(rgb, 'RGB').save(img_path)
+                ok = cv2.imwrite(img_path, _apply_cityscapes_palette(arr),
+                                 PNG_WRITE_PARAMS)
             else:
-                # BGRA → RGBA for Pillow, then save as PNG
-                rgba = arr[:, :, [2, 1, 0, 3]]  # BGRA → RGBA
-                PilImage.fromarray(rgba, 'RGBA').save(img_path)
+                # OpenCV takes CARLA's BGRA layout as-is — no channel swap copy.
+                ok = cv2.imwrite(img_path, arr, PNG_WRITE_PARAMS)
+            # cv2.imwrite reports failure (missing folder, full disk) through
+            # its return value only; raise so the frame is reported below.
+            if not ok:
+                raise IOError(f"failed to write {img_path}")
 
             # 3D bbox: only for RGB cameras; pass pre-copied transform + fov.
             if (blueprint_id == "sensor.camera.rgb" and
@@ -216,36 +306,36 @@ def write_sensor_data(payload_tuple, timestamp, sensor_name, save_path,
 
         elif kind == 'semantic_lidar':
             _, raw = payload_tuple
-            points = np.frombuffer(raw, dtype=np.dtype([
-                ('x', np.float32), ('y', np.float32), ('z', np.float32),
-                ('cos_inc_angle', np.float32),
-                ('object_idx', np.uint32), ('semantic_tag', np.uint32)
-            ]))
-            npy_path = os.path.join(sensor_folder, f"{timestamp}.npy")
-            np.save(npy_path, points)
-            # Write PLY manually — no save_to_disk
-            ply_path = os.path.join(sensor_folder, f"{timestamp}.ply")
-            _write_semantic_lidar_ply(points, ply_path)
+            points = np.frombuffer(raw, dtype=SEMANTIC_LIDAR_DTYPE)
+            # NPY only — convert offline with npy_to_ply.py if a PLY is needed.
+            _save_npy(f"{stem}.npy", points, align=NPY_HEADER_ALIGN)
 
         elif kind == 'lidar':
-            _, raw = payload_tuple
-            pts = raw.reshape((-1, 4))
-            np.save(os.path.join(sensor_folder, f"{timestamp}.npy"), pts)
+            _, pts = payload_tuple   # already (N, 4) float32
+            _save_npy(f"{stem}.npy", pts, align=NPY_HEADER_ALIGN)
 
         elif kind == 'radar':
-            _, pts = payload_tuple
-            arr = np.array(pts, dtype=np.float32)
-            np.save(os.path.join(sensor_folder, f"{timestamp}.npy"), arr)
+            _, raw = payload_tuple
+            depth = raw['depth']
+            # Fill a preallocated float32 buffer column by column rather than
+            # stacking float64 temporaries and casting afterwards.
+            arr = np.empty((len(raw), 5), dtype=np.float32)
+            arr[:, 0] = depth
+            np.degrees(raw['altitude'], out=arr[:, 1])
+            np.degrees(raw['azimuth'], out=arr[:, 2])
+            arr[:, 3] = raw['velocity']
+            arr[:, 4] = calculate_radar_intensity(depth)
+            _save_npy(f"{stem}.npy", arr)
 
         elif kind == 'imu':
-            _, data = payload_tuple
-            with open(os.path.join(sensor_folder, f"{timestamp}.json"), 'w') as f:
-                json.dump(data, f, separators=(',', ':'))
+            _, values = payload_tuple
+            with open(f"{stem}.json", 'w') as f:
+                f.write(_encode_imu(timestamp, values))
 
         elif kind == 'gnss':
-            _, data = payload_tuple
-            with open(os.path.join(sensor_folder, f"{timestamp}.json"), 'w') as f:
-                json.dump(data, f, separators=(',', ':'))
+            _, values = payload_tuple
+            with open(f"{stem}.json", 'w') as f:
+                f.write(_encode_gnss(timestamp, values))
 
         done_queue.put((timestamp, sensor_name))
 
@@ -256,22 +346,24 @@ def write_sensor_data(payload_tuple, timestamp, sensor_name, save_path,
         done_queue.put((0, sensor_name))
 
 
-def _write_semantic_lidar_ply(points, path):
-    """Write semantic LiDAR structured array to ASCII PLY without CARLA."""
-    n = len(points)
-    lines = [
-        "ply", "format ascii 1.0",
-        f"element vertex {n}",
-        "property float x", "property float y", "property float z",
-        "property float cos_inc_angle",
-        "property uint object_idx", "property uint semantic_tag",
-        "end_header",
-    ]
-    with open(path, 'w') as f:
-        f.write('\n'.join(lines) + '\n')
-        for p in points:
-            f.write(f"{p['x']} {p['y']} {p['z']} "
-                    f"{p['cos_inc_angle']} {p['object_idx']} {p['semantic_tag']}\n")
+def write_sensor_batch(items, static_vehicles, done_queue):
+    """Serialise several queued frames in one executor job.
+
+    Used for the tiny IMU/GNSS JSON payloads, where scheduling one job per
+    frame costs more than the write itself.  Each item is the tuple put on
+    the raw queue by sensor_callback."""
+    for item in items:
+        write_sensor_data(*item, static_vehicles, done_queue)
+
+
+def _remove_file(file_path):
+    """Delete one file; returns True on success."""
+    try:
+        os.remove(file_path)
+        return True
+    except Exception as e:
+        print(f"Error deleting file {file_path}: {e}")
+        return False
 
 
 def clean_scene_data(scene_path, sensor_names):
@@ -279,28 +371,25 @@ def clean_scene_data(scene_path, sensor_names):
     Nettoie le jeu de données d'une scène en supprimant les fichiers dont le timestamp
     n'est pas présent dans tous les dossiers de capteurs.
     """
+    # Each folder is scanned once; the delete pass reuses these listings.
+    entries_by_sensor = {}
     ts_dict = {}
     for sensor in sensor_names:
         sensor_folder = os.path.join(scene_path, sensor)
         if not os.path.isdir(sensor_folder):
             continue
 
-        # Skip instance segmentation folders entirely
+        with os.scandir(sensor_folder) as it:
+            entries = [(e.name, e.path) for e in it if e.is_file()]
+        entries_by_sensor[sensor] = entries
+
+        # Instance segmentation folders do not take part in the intersection
         if "instance" in sensor_folder:
             continue
 
-        files = []
-        for f in os.listdir(sensor_folder):
-            if any(f.endswith(ext) for ext in ['.png', '.npy', '.json', '.ply']):
-                if "_3dbbox.json" in f:
-                    continue
-                if f.endswith('.ply'):
-                    npy_file = f[:-4] + '.npy'
-                    if not os.path.exists(os.path.join(sensor_folder, npy_file)):
-                        continue
-                files.append(f)
-
-        ts_set = set(os.path.splitext(f)[0] for f in files)
+        ts_set = {os.path.splitext(name)[0] for name, _ in entries
+                  if name.endswith(('.png', '.npy', '.json'))
+                  and "_3dbbox.json" not in name}
         if ts_set:
             ts_dict[sensor] = ts_set
 
@@ -316,13 +405,9 @@ def clean_scene_data(scene_path, sensor_names):
 
     print(f"Found {len(common_ts)} common timestamps across all sensors")
 
-    deleted_count = 0
-    for sensor in sensor_names:
-        sensor_folder = os.path.join(scene_path, sensor)
-        if not os.path.isdir(sensor_folder):
-            continue
-
-        for file_name in os.listdir(sensor_folder):
+    delete_paths = []
+    for entries in entries_by_sensor.values():
+        for file_name, file_path in entries:
             if "_3dbbox.json" in file_name:
                 base_ts = file_name.split("_3dbbox.json")[0]
                 if base_ts in common_ts:
@@ -330,12 +415,11 @@ def clean_scene_data(scene_path, sensor_names):
 
             base_name = os.path.splitext(file_name)[0]
             if base_name not in common_ts:
-                file_path = os.path.join(sensor_folder, file_name)
-                try:
-                    os.remove(file_path)
-                    deleted_count += 1
-                except Exception as e:
-                    print(f"Error deleting file {file_path}: {e}")
+                delete_paths.append(file_path)
+
+    # Suppressions indépendantes : plusieurs threads gardent le disque occupé
+    with ThreadPoolExecutor(max_workers=CLEANUP_WORKERS) as pool:
+        deleted_count = sum(pool.map(_remove_file, delete_paths))
 
     if deleted_count > 0:
         print(f"Cleaned up {deleted_count} non-synchronized files")
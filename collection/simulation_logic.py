@@ -13,6 +13,12 @@ def create_scene_folders(scene_id, sensor_names, base_save_path):
 
     return scene_path
 
+def tick_world(world, n):
+    """ Avance la simulation synchrone de n ticks (stabilisation, transitions). """
+    tick = world.tick
+    for _ in range(n):
+        tick()
+
 def run_simulation(scene_id, world, vehicle, sensor_list, sensor_queue, ticks_per_scene):
     """ Exécute une simulation en s'assurant que chaque tick contient bien une donnée pour chaque capteur. """
 
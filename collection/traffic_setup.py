@@ -46,10 +46,7 @@ def setup_traffic(client, world, traffic_config):
         for bp in blueprints:
             bp_id = bp.id.lower()
             # Match against known blueprint IDs; fall back to car for any unknown vehicle
-            nuscenes_cat = next(
-                (cat for known_id, cat in BLUEPRINT_TO_NUSCENES.items() if bp_id == known_id),
-                'vehicle.car'
-            )
+            nuscenes_cat = BLUEPRINT_TO_NUSCENES.get(bp_id, 'vehicle.car')
             print(f"  {bp.id:55s} -> {nuscenes_cat}")
             if nuscenes_cat in category_pools:
                 category_pools[nuscenes_cat].append(bp)
@@ -71,6 +68,17 @@ def setup_traffic(client, world, traffic_config):
             category_pools['vehicle.car'] = list(blueprints)
             category_weights['vehicle.car'] = 1.0
 
+        # role_name est identique pour tous les véhicules : fixé une fois par blueprint
+        for pool in category_pools.values():
+            for bp in pool:
+                bp.set_attribute('role_name', 'autopilot')
+
+        # Couleurs recommandées lues une seule fois par blueprint
+        recommended_colors = {
+            bp.id: bp.get_attribute('color').recommended_values
+            for bp in blueprints if bp.has_attribute('color')
+        }
+
         # If safe_spawn requested, still keep to known types but already enforced by pools
         blueprintsWalkers = world.get_blueprint_library().filter('walker.pedestrian.*')
 
@@ -109,10 +117,9 @@ def setup_traffic(client, world, traffic_config):
             transform = spawn_points[idx_sp]
             idx_sp += 1
             blueprint = random.choice(pool)
-            if blueprint.has_attribute('color'):
-                color = random.choice(blueprint.get_attribute('color').recommended_values)
-                blueprint.set_attribute('color', color)
-            blueprint.set_attribute('role_name', 'autopilot')
+            colors = recommended_colors.get(blueprint.id)
+            if colors:
+                blueprint.set_attribute('color', random.choice(colors))
             batch.append(carla.command.SpawnActor(blueprint, transform)
                 .then(carla.command.SetAutopilot(carla.command.FutureActor, True)))
 
@@ -122,18 +129,18 @@ def setup_traffic(client, world, traffic_config):
             weights = [category_weights[c] for c in available_categories]
             s = sum(weights) or 1.0
             weights = [w / s for w in weights]
-            for i in range(remaining):
+            # Tirage groupé des catégories plutôt qu'un appel par véhicule
+            chosen_categories = random.choices(available_categories, weights=weights, k=remaining)
+            for chosen_category in chosen_categories:
                 transform = spawn_points[idx_sp]
                 idx_sp += 1
-                chosen_category = random.choices(available_categories, weights=weights, k=1)[0]
                 pool = category_pools.get(chosen_category, [])
                 if not pool:
                     pool = category_pools.get('vehicle.car', []) or list(blueprints)
                 blueprint = random.choice(pool)
-                if blueprint.has_attribute('color'):
-                    color = random.choice(blueprint.get_attribute('color').recommended_values)
-                    blueprint.set_attribute('color', color)
-                blueprint.set_attribute('role_name', 'autopilot')
+                colors = recommended_colors.get(blueprint.id)
+                if colors:
+                    blueprint.set_attribute('color', random.choice(colors))
                 batch.append(carla.command.SpawnActor(blueprint, transform)
                     .then(carla.command.SetAutopilot(carla.command.FutureActor, True)))
 
@@ -166,8 +173,8 @@ def setup_traffic(client, world, traffic_config):
         walker_speed = []
         walkers_list = []
         
-        for spawn_point in spawn_points:
-            walker_bp = random.choice(blueprintsWalkers)
+        walker_bps = random.choices(list(blueprintsWalkers), k=len(spawn_points))
+        for spawn_point, walker_bp in zip(spawn_points, walker_bps):
             # set as not invincible
             if walker_bp.has_attribute('is_invincible'):
                 walker_bp.set_attribute('is_invincible', 'false')
@@ -238,9 +245,15 @@ def setup_traffic(client, world, traffic_config):
         print(f"Error setting up traffic: {e}")
         return []
 
-def spawn_ego_vehicle(world, blueprint_library, traffic_manager, max_retries=10):
-    """Safely spawn the ego vehicle by trying different spawn points"""
-    spawn_points = world.get_map().get_spawn_points()
+def spawn_ego_vehicle(world, blueprint_library, traffic_manager, max_retries=10,
+                      spawn_points=None):
+    """Safely spawn the ego vehicle by trying different spawn points.
+
+    spawn_points may be passed in by callers that spawn repeatedly, to avoid
+    fetching the map again; the list is copied before shuffling."""
+    if spawn_points is None:
+        spawn_points = world.get_map().get_spawn_points()
+    spawn_points = list(spawn_points)
     random.shuffle(spawn_points)  # Randomize spawn points
     
     bp = blueprint_library.find('vehicle.lincoln.mkz')
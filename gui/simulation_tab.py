@@ -28,6 +28,10 @@ class SimulationTab(QWidget):
         self.frequency_hz = frequency_container.findChild(QSpinBox)
         
         self.base_save_path = self._create_path_selector("Base Save Path:", "./data/_out")
+
+        # No widget for this one: kept from the loaded config.yml so saving
+        # from the GUI does not drop it
+        self.verbose = False
         
         # Traffic Group
         traffic_group = QGroupBox("Traffic Settings")
@@ -111,6 +115,7 @@ class SimulationTab(QWidget):
         self.seconds_per_scene.setValue(int(sim.get("seconds_per_scene", self.seconds_per_scene.value())))
         self.frequency_hz.setValue(int(sim.get("frequency_hz", self.frequency_hz.value())))
         self.path_edit.setText(str(sim.get("base_save_path", self.path_edit.text())))
+        self.verbose = bool(sim.get("verbose", self.verbose))
         self.num_vehicles.setValue(int(traffic.get("num_vehicles", self.num_vehicles.value())))
         self.num_pedestrians.setValue(int(traffic.get("num_pedestrians", self.num_pedestrians.value())))
         self.safe_spawn.setChecked(bool(traffic.get("safe_spawn", self.safe_spawn.isChecked())))
@@ -127,6 +132,7 @@ class SimulationTab(QWidget):
                 "seconds_per_scene": self.seconds_per_scene.value(),
                 "frequency_hz": self.frequency_hz.value(),
                 "base_save_path": self.path_edit.text(),
+                "verbose": self.verbose,
                 "traffic": {
                     "num_vehicles": self.num_vehicles.value(),
                     "num_pedestrians": self.num_pedestrians.value(),
@@ -1,10 +1,15 @@
 import os
 import sys
+import functools
+import threading
+import queue
+from collections import OrderedDict
 import numpy as np
 import pygame
 import time
 from pathlib import Path
 import math
+from concurrent.futures import ThreadPoolExecutor
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_agg import FigureCanvasAgg
 import yaml
@@ -19,9 +24,23 @@ from replay_processing import (
     process_lidar,
     process_semantic_lidar,
     process_imu,
-    process_gnss
+    process_gnss,
+    load_image,
+    make_lidar_canvas,
+    read_json,
+    get_font,
+    TEXT_LOCK
 )
 
+# Marges réservées au header (titre) et au footer (timestamp)
+HEADER_HEIGHT = 60
+FOOTER_HEIGHT = 60
+# Timestamps whose rendered surfaces are kept (for every sensor), so
+# stepping back and forth does not redo the processing
+FRAME_CACHE_FRAMES = 16
+# Upcoming timestamps rendered ahead in the background
+PREFETCH_AHEAD = 4
+
 class FlexibleDataPlayer:
     """ Flexible player to support various sensors (camera, radar, lidar) """
     def __init__(self, data_dir, annotation_type="2d", show_visibility=False):
@@ -75,6 +94,8 @@ class FlexibleDataPlayer:
                         "type": actual_type,
                         "path": sensor_folder,
                         "files": files,
+                        # timestamp -> file, so frames are found without scanning
+                        "by_ts": {int(f.stem): f for f in files},
                         "last_valid": None,
                         "name": sname
                     }
@@ -82,16 +103,21 @@ class FlexibleDataPlayer:
             raise RuntimeError("No sensor data found using configuration!")
         print(f"Detected sensors: {list(self.sensors.keys())}")
         
-        # Compute common timestamps by finding intersection of file stems (as int)
-        ts_sets = []
-        for sensor in self.sensors.values():
-            ts = set(int(f.stem) for f in sensor["files"])
-            ts_sets.append(ts)
-        self.timestamps = sorted(list(set.intersection(*ts_sets))) if ts_sets else []
+        # Compute common timestamps by intersecting the sorted stems of every sensor
+        ts_arrays = [np.fromiter(sensor["by_ts"], dtype=np.int64, count=len(sensor["by_ts"]))
+                     for sensor in self.sensors.values()]
+        self.timestamps = (functools.reduce(np.intersect1d, ts_arrays[1:], np.unique(ts_arrays[0])).tolist()
+                           if ts_arrays else [])
         if not self.timestamps:
             raise RuntimeError("No common timestamps found among sensors!")
         print(f"Found {len(self.timestamps)} common timestamps.")
 
+        # IMU / GNSS records are tiny: parse them all up front so their
+        # views only render text during playback
+        for sensor in self.sensors.values():
+            if sensor["type"] in ("imu", "gnss"):
+                sensor["data"] = {ts: self.preload_json(sensor["by_ts"][ts]) for ts in self.timestamps}
+
         # Compute grid size
         self.num_sensors = len(self.sensors)
         cols = int(math.ceil(math.sqrt(self.num_sensors)))
@@ -113,9 +139,34 @@ class FlexibleDataPlayer:
         self.cell_size = (cell_width, cell_height)
         self.window_size = (cols * cell_width, rows * cell_height)
         
-        self.display = pygame.display.set_mode(self.window_size)
+        # No SCALED: SDL would upscale the window past the 75% height cap and
+        # the views are already rendered at their on-screen size
+        self.display = pygame.display.set_mode(self.window_size, pygame.DOUBLEBUF)
         pygame.display.set_caption("Flexible Sensor Replay")
+
+        # Radar / lidar views are rendered straight at the size they are
+        # shown at, rather than at cell_size and then scaled down
+        for idx, sensor in enumerate(self.sensors.values()):
+            if sensor["type"] in ("radar", "lidar", "semantic_lidar"):
+                sensor["size"] = self.fit_size(self.cell_size, self.cell_rect(idx)[2])
+            else:
+                sensor["size"] = self.cell_size
+            # Buffer + surface redrawn in place each frame by the lidar views
+            if sensor["type"] in ("lidar", "semantic_lidar"):
+                sensor["canvas"] = make_lidar_canvas(sensor["size"])
         self.clock = pygame.time.Clock()
+        # Sensors are decoded / rasterized in parallel, then blitted in order
+        self.pool = ThreadPoolExecutor(max_workers=self.num_sensors)
+        # LRU of rendered surfaces keyed by (sensor name, timestamp)
+        self.frame_cache = OrderedDict()
+        self.frame_cache_size = FRAME_CACHE_FRAMES * self.num_sensors
+        self.frame_cache_lock = threading.Lock()
+        # One render at a time per sensor: the lidar canvases are reused in place
+        for sensor in self.sensors.values():
+            sensor["lock"] = threading.Lock()
+        # Background thread filling the cache for the next timestamps
+        self.prefetch_queue = queue.Queue()
+        threading.Thread(target=self.prefetch_worker, daemon=True).start()
 
         self.current_index = 0
         self.auto_play = True
@@ -155,38 +206,115 @@ class FlexibleDataPlayer:
             28: (180, 165, 180),  # guard rail
             29: (180, 130, 70),   # rock
         }
+        # Dense lookup table for vectorized colouring; unknown tags are white
+        self.semantic_lut = np.full((256, 3), 255, dtype=np.uint8)
+        for tag, color in self.semantic_colors.items():
+            self.semantic_lut[tag] = color
 
-    def scale_to_fit(self, surface, target_size):
-        """Redimensionne la surface pour tenir dans target_size tout en préservant l'aspect ratio."""
-        sw, sh = surface.get_size()
+    @staticmethod
+    def preload_json(path):
+        """Parse a record at startup; None if unreadable, so that frame is re-read (and reported) when shown."""
+        try:
+            return read_json(path)
+        except (OSError, ValueError):
+            return None
+
+    def cell_rect(self, idx):
+        """Position (x, y) et taille cible de la cellule du capteur idx."""
+        rows, cols = self.grid
+        window_width, window_height = self.window_size
+        effective_cell_height = (window_height - HEADER_HEIGHT - FOOTER_HEIGHT) / rows
+        effective_cell_width = window_width / cols
+        r, c = divmod(idx, cols)
+        # Si la dernière ligne contient un seul capteur, il prend toute la largeur
+        if r == (rows - 1) and (self.num_sensors % cols == 1):
+            return 0, HEADER_HEIGHT + r * effective_cell_height, (window_width, effective_cell_height)
+        return (c * effective_cell_width, HEADER_HEIGHT + r * effective_cell_height,
+                (effective_cell_width, effective_cell_height))
+
+    @staticmethod
+    def fit_size(size, target_size):
+        """Plus grande taille de même aspect ratio que size tenant dans target_size."""
+        sw, sh = size
         tw, th = target_size
         scale = min(tw / sw, th / sh)
-        new_size = (max(1, int(sw * scale)), max(1, int(sh * scale)))
+        return (max(1, int(sw * scale)), max(1, int(sh * scale)))
+
+    def scale_to_fit(self, surface, target_size):
+        """Redimensionne la surface pour tenir dans target_size tout en préservant l'aspect ratio."""
+        new_size = self.fit_size(surface.get_size(), target_size)
+        if new_size == surface.get_size():
+            return surface
         return pygame.transform.smoothscale(surface, new_size)
 
+    def scale_cached(self, sensor, surface, target_size):
+        """scale_to_fit, reusing the sensor's last result while it hands back the same surface."""
+        memo = sensor.get("scaled")
+        if memo is not None and memo[0] is surface and memo[1] == target_size:
+            return memo[2]
+        scaled = self.scale_to_fit(surface, target_size)
+        # Holding the source keeps its identity valid for the next comparison
+        sensor["scaled"] = (surface, target_size, scaled)
+        return scaled
+
     def process_sensor(self, sensor, timestamp):
-        """Process sensor data for visualization"""
-        file = next((f for f in sensor["files"] if int(f.stem) == timestamp), None)
+        """Process sensor data for visualization, served from the frame cache when possible"""
+        img = self.cached_render(sensor, timestamp)
+        sensor["last_valid"] = img
+        return img
+
+    def cached_render(self, sensor, timestamp):
+        """Frame cache lookup; renders and inserts the surface on a miss"""
+        key = (sensor["name"], timestamp)
+        with self.frame_cache_lock:
+            img = self.frame_cache.get(key)
+            if img is not None:
+                self.frame_cache.move_to_end(key)
+                return img
+        with sensor["lock"]:
+            # The prefetch thread may have rendered it while we waited
+            with self.frame_cache_lock:
+                img = self.frame_cache.get(key)
+            if img is None:
+                img = self.render_sensor(sensor, timestamp)
+                with self.frame_cache_lock:
+                    self.frame_cache[key] = img
+                    if len(self.frame_cache) > self.frame_cache_size:
+                        self.frame_cache.popitem(last=False)
+        return img
+
+    def prefetch_worker(self):
+        """Render queued timestamp indices into the frame cache, skipping stale ones"""
+        while True:
+            index = self.prefetch_queue.get()
+            if self.current_index < index < len(self.timestamps):
+                ts = self.timestamps[index]
+                for sensor in self.sensors.values():
+                    self.cached_render(sensor, ts)
+
+    def render_sensor(self, sensor, timestamp):
+        """Render one sensor frame; falls back to the last frame shown"""
+        file = sensor["by_ts"].get(timestamp)
         
         if file:
             try:
                 sensor_type = sensor["type"]
                 if sensor_type == "imu":
-                    return process_imu(file, self.cell_size)
+                    return process_imu(file, self.cell_size, sensor["data"][timestamp])
                 elif sensor_type == "gnss":
-                    return process_gnss(file, self.cell_size)
+                    return process_gnss(file, self.cell_size, sensor["data"][timestamp])
                 elif sensor_type == "camera":
                     return process_camera(file, sensor["name"], self.annotation_type, self.cell_size, self.show_visibility)
                 elif sensor_type == "semantic_camera":
-                    return pygame.image.load(str(file))  # Load semantic segmentation directly
+                    return load_image(str(file))  # Load semantic segmentation directly
                 elif sensor_type == "instance_camera":
-                    return pygame.image.load(str(file))  # Load instance segmentation directly
+                    return load_image(str(file))  # Load instance segmentation directly
                 elif sensor_type == "radar":
-                    return process_radar(file, self.cell_size)
+                    return process_radar(file, sensor["size"])
                 elif sensor_type == "semantic_lidar":
-                    return process_semantic_lidar(file, self.cell_size, self.semantic_colors)
+                    return process_semantic_lidar(file, sensor["size"], self.semantic_lut, sensor["canvas"])
                 elif sensor_type == "lidar":
-                    return process_lidar(file, self.cell_size)
+                    return process_lidar(file, sensor["size"], sensor["canvas"])
                 
             except Exception as e:
                 print(f"Error processing {sensor['name']} at timestamp {timestamp}: {e}")
@@ -196,24 +324,26 @@ class FlexibleDataPlayer:
     def run(self):
         running = True
         sensor_keys = list(self.sensors.keys())
-        rows, cols = self.grid
         window_width, window_height = self.window_size
-        
-        # Définir des marges pour le header et le footer
-        header_height = 60
-        footer_height = 60
-        
-        # Calculer les dimensions effectives de la zone de grille
-        effective_height = window_height - header_height - footer_height
-        effective_cell_height = effective_height / rows
-        effective_cell_width = window_width / cols
+        header_height = HEADER_HEIGHT
+        footer_height = FOOTER_HEIGHT
         
         # Initialisation des polices pour afficher le titre, timestamp et les noms de capteurs
-        sensor_font = pygame.font.Font(None, 24)
-        scene_font = pygame.font.Font(None, 36)
+        sensor_font = get_font(24)
+        scene_font = get_font(36)
         
         # Extraire le nom de la scène à partir du chemin de données
         scene_name = os.path.basename(os.path.normpath(str(self.data_dir)))
+
+        # La géométrie et les textes statiques ne changent pas : calculés une fois
+        display = self.display
+        sensors = [self.sensors[key] for key in sensor_keys]
+        cells = [self.cell_rect(idx) for idx in range(len(sensor_keys))]
+        sensor_texts = [sensor_font.render(key, True, (255,255,255)) for key in sensor_keys]
+        scene_text = scene_font.render(f"Scene: {scene_name}", True, (255,255,255))
+        scene_rect = scene_text.get_rect(center=(window_width//2, header_height//2))
+        num_timestamps = len(self.timestamps)
+        prefetched_index = None
         while running:
             current_time = time.time()
             for event in pygame.event.get():
@@ -241,43 +371,39 @@ class FlexibleDataPlayer:
                     print("\nReached end of sequence. Auto-play deactivated.")
     
             # Clear display et dessiner les zones réservées au header et footer
-            self.display.fill((0,0,0))
-            pygame.draw.rect(self.display, (0,0,0), (0, 0, window_width, header_height))
-            pygame.draw.rect(self.display, (0,0,0), (0, window_height - footer_height, window_width, footer_height))
+            display.fill((0,0,0))
+            pygame.draw.rect(display, (0,0,0), (0, 0, window_width, header_height))
+            pygame.draw.rect(display, (0,0,0), (0, window_height - footer_height, window_width, footer_height))
             
             ts = self.timestamps[self.current_index]
+            # Queue the next timestamps for the background renderer
+            if prefetched_index != self.current_index:
+                prefetched_index = self.current_index
+                for index in range(self.current_index + 1,
+                                   min(self.current_index + 1 + PREFETCH_AHEAD, num_timestamps)):
+                    self.prefetch_queue.put(index)
             # Afficher le titre de la scène au centre du header
-            scene_text = scene_font.render(f"Scene: {scene_name}", True, (255,255,255))
-            scene_rect = scene_text.get_rect(center=(window_width//2, header_height//2))
-            self.display.blit(scene_text, scene_rect)
+            display.blit(scene_text, scene_rect)
             
-            for idx, key in enumerate(sensor_keys):
-                sensor = self.sensors[key]
-                img = self.process_sensor(sensor, ts)
-                r = idx // cols
-                c = idx % cols
-                # Si la dernière ligne contient un seul capteur
-                if r == (rows - 1) and (len(sensor_keys) % cols == 1):
-                    target = (window_width, effective_cell_height)
-                    cell_x, cell_y = 0, header_height + r * effective_cell_height
-                else:
-                    target = (effective_cell_width, effective_cell_height)
-                    cell_x, cell_y = c * effective_cell_width, header_height + r * effective_cell_height
+            futures = [self.pool.submit(self.process_sensor, sensor, ts) for sensor in sensors]
+            for sensor, future, (cell_x, cell_y, target), sensor_text in zip(sensors, futures, cells, sensor_texts):
+                img = future.result()
                 # Redimensionner l'image sans déformer (aspect ratio conservé)
-                scaled_img = self.scale_to_fit(img, target)
+                scaled_img = self.scale_cached(sensor, img, target)
                 offset_x = (target[0] - scaled_img.get_width()) // 2
                 offset_y = (target[1] - scaled_img.get_height()) // 2
-                self.display.blit(scaled_img, (cell_x + offset_x, cell_y + offset_y))
+                display.blit(scaled_img, (cell_x + offset_x, cell_y + offset_y))
                 # Afficher le nom du capteur en haut à gauche de la cellule
-                sensor_text = sensor_font.render(key, True, (255,255,255))
-                self.display.blit(sensor_text, (cell_x + 5, cell_y + 5))
+                display.blit(sensor_text, (cell_x + 5, cell_y + 5))
             
             # Afficher le timestamp dans le footer centré horizontalement
-            timestamp_text = scene_font.render(f"Timestamp: {ts} ({self.current_index+1}/{len(self.timestamps)})", True, (255,255,255))
+            with TEXT_LOCK:
+                timestamp_text = scene_font.render(f"Timestamp: {ts} ({self.current_index+1}/{num_timestamps})", True, (255,255,255))
             timestamp_rect = timestamp_text.get_rect(center=(window_width//2, window_height - footer_height//2))
-            self.display.blit(timestamp_text, timestamp_rect)
+            display.blit(timestamp_text, timestamp_rect)
             pygame.display.flip()
             self.clock.tick(20)
+        self.pool.shutdown()
         pygame.quit()
 
 if __name__ == "__main__":
@@ -1,5 +1,7 @@
 import os
 import sys
+import functools
+import threading
 import numpy as np
 import pygame
 import time
@@ -8,34 +10,74 @@ import math
 import yaml
 import json
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 from matplotlib.backends.backend_agg import FigureCanvasAgg
 
+# Parsed bbox files and text panels are kept for the most recent timestamps.
+# Decoded images are not: the player's frame cache already holds the
+# rendered frames, so pausing or stepping back does not re-read the disk.
+FILE_CACHE_SIZE = 64
+
+# Frames may be built on worker threads; pygame.font and matplotlib's
+# rcParams are not thread-safe, so font/text work is done under this lock.
+TEXT_LOCK = threading.Lock()
+
+
+@functools.lru_cache(maxsize=None)
+def get_font(size):
+    """Default pygame font at this size, built once (render() still needs TEXT_LOCK)."""
+    with TEXT_LOCK:
+        return pygame.font.Font(None, size)
+
+
+def load_image(path):
+    """Load an image from disk.
+
+    Once a display exists the image is converted to its pixel format, so the
+    blits done every frame are plain memory copies.
+    """
+    image = pygame.image.load(path)
+    if pygame.display.get_surface() is not None:
+        image = image.convert()
+    return image
+
+
+@functools.lru_cache(maxsize=FILE_CACHE_SIZE)
+def load_json(path):
+    """Parse a JSON file once per path; returns None if it does not exist."""
+    if not os.path.exists(path):
+        return None
+    return read_json(path)
+
+
+def read_json(path):
+    """Parse a JSON file from its raw bytes (skips the text-mode decode layer)."""
+    return json.loads(Path(path).read_bytes())
+
+
 def process_camera(file_path, camera_name, annotation_type="2d", cell_size=(800, 600), show_visibility=False):
     """Process camera data for visualization"""
     try:
         # Load the image
-        image = pygame.image.load(str(file_path))
+        image = load_image(str(file_path))
         
         # Get timestamp from filename
         timestamp = int(Path(file_path).stem)
         
         if annotation_type == "3d":
             # Look for corresponding 3D bbox file
-            bbox_file = file_path.parent / f"{timestamp}_3dbbox.json"
-            if bbox_file.exists():
-                with open(bbox_file, 'r') as f:
-                    bbox_data = json.load(f)
-                    
+            bbox_data = load_json(str(file_path.parent / f"{timestamp}_3dbbox.json"))
+            if bbox_data:
                 # Create a larger font for rendering text
-                font = pygame.font.Font(None, 36)
+                font = get_font(36)
                 
                 # Draw 3D bounding boxes and visibility
                 for bbox in bbox_data:
-                    if "clipped_segments" in bbox:
-                        # Draw 3D bounding box edges in green
-                        for segment in bbox["clipped_segments"]:
-                            p1 = (int(segment[0][0]), int(segment[0][1]))
-                            p2 = (int(segment[1][0]), int(segment[1][1]))
+                    if bbox.get("clipped_segments"):
+                        # Draw 3D bounding box edges in green; endpoints are
+                        # truncated to pixels for the whole box at once
+                        segments = np.asarray(bbox["clipped_segments"], dtype=np.float64)
+                        for p1, p2 in segments[:, :, :2].astype(np.int64).tolist():
                             pygame.draw.line(image, (0, 255, 0), p1, p2, 2)
                         
                         # Draw visibility if enabled
@@ -48,7 +90,8 @@ def process_camera(file_path, camera_name, annotation_type="2d", cell_size=(800,
                                 
                                 # Create visibility text
                                 visibility_text = f"{visibility:.1f}%"
-                                text_surface = font.render(visibility_text, True, (255, 255, 255))
+                                with TEXT_LOCK:
+                                    text_surface = font.render(visibility_text, True, (255, 255, 255))
                                 
                                 # Draw text background with padding and border
                                 text_rect = text_surface.get_rect()
@@ -64,49 +107,53 @@ def process_camera(file_path, camera_name, annotation_type="2d", cell_size=(800,
         
         else:  # annotation_type == "2d"
             # Look for corresponding 2D bbox file
-            bbox_file = file_path.parent / f"{timestamp}_bbox.json"
-            if bbox_file.exists():
-                with open(bbox_file, 'r') as f:
-                    bbox_data = json.load(f)
-                
-                # Draw 2D bounding boxes in red
-                if isinstance(bbox_data, dict) and 'bounding_boxes' in bbox_data:
-                    for bbox in bbox_data['bounding_boxes']:
-                        if 'bbox' in bbox:
-                            x, y, w, h = bbox['bbox']
-                            pygame.draw.rect(image, (255, 0, 0), (x, y, w, h), 2)
+            bbox_data = load_json(str(file_path.parent / f"{timestamp}_bbox.json"))
+            # Draw 2D bounding boxes in red
+            if isinstance(bbox_data, dict) and bbox_data.get('bounding_boxes'):
+                for bbox in bbox_data['bounding_boxes']:
+                    if 'bbox' in bbox:
+                        x, y, w, h = bbox['bbox']
+                        pygame.draw.rect(image, (255, 0, 0), (x, y, w, h), 2)
         
         return image
     except Exception as e:
         print(f"Error processing camera data: {e}")
         return pygame.Surface(cell_size)
 
-def process_radar(file_path, cell_size):
-    try:
-        data = np.load(file_path)
-        # Create range-doppler map
-        v_bins = 128
-        r_bins = 128
-        max_range = 250
-        max_velocity = 30
-        intensity_min = -70
-        intensity_max = 0
-        intensity_matrix = np.zeros((r_bins, v_bins))
-        for point in data:
-            depth, _, _, velocity, intensity = point
-            r_idx = int((depth / max_range) * (r_bins - 1))
-            v_idx = int(((velocity + max_velocity) / (2 * max_velocity)) * (v_bins - 1))
-            if 0 <= r_idx < r_bins and 0 <= v_idx < v_bins:
-                intensity_matrix[r_idx, v_idx] += intensity
-        range_doppler = 20 * np.log10(intensity_matrix + 1e-10)
-        
-        # Use a larger figure (8x6) to improve resolution and text clarity
-        plt.style.use('dark_background')
-        fig, ax = plt.subplots(figsize=(8,6))  # Increased figure size
+# Range-Doppler map layout
+RADAR_R_BINS = 128
+RADAR_V_BINS = 128
+RADAR_MAX_RANGE = 250
+RADAR_MAX_VELOCITY = 30
+RADAR_DB_MIN = -70
+RADAR_DB_MAX = 0
+
+# 256-entry jet colormap, the same bytes matplotlib uses when rasterizing
+_JET_LUT = plt.get_cmap('jet')(np.arange(256), bytes=True)[:, :3]
+
+
+@functools.lru_cache(maxsize=None)
+def _radar_chrome(size):
+    """Render the static Range-Doppler figure (axes, labels, colorbar) once per (w, h) size.
+
+    Returns the figure as a pygame Surface plus the plot interior as
+    (top, bottom, left, right) pixel bounds and the nearest-neighbour row /
+    column indices mapping that interior onto the bin matrix, and a
+    transparent overlay of the spines and ticks to draw back on top of the
+    heatmap.
+    """
+    with TEXT_LOCK, plt.style.context('dark_background'):
+        # Keep the original 8-inch-wide layout, but pick the dpi so the
+        # figure comes out at the pixel size the view is displayed at
+        dpi = size[0] / 8
+        fig = Figure(figsize=(8, size[1] / dpi), dpi=dpi)
+        canvas = FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
         fig.patch.set_facecolor('black')
-        im = ax.imshow(range_doppler, aspect='auto', origin='lower', cmap='jet',
-                        extent=[-max_velocity, max_velocity, 0, max_range],
-                        vmin=intensity_min, vmax=intensity_max)
+        im = ax.imshow(np.full((RADAR_R_BINS, RADAR_V_BINS), RADAR_DB_MIN),
+                       aspect='auto', origin='lower', cmap='jet',
+                       extent=[-RADAR_MAX_VELOCITY, RADAR_MAX_VELOCITY, 0, RADAR_MAX_RANGE],
+                       vmin=RADAR_DB_MIN, vmax=RADAR_DB_MAX)
         cbar = fig.colorbar(im)
         cbar.ax.tick_params(colors='white', labelsize=8)
         cbar.set_label('Intensity (dB)', color='white', fontsize=8)
@@ -118,166 +165,252 @@ def process_radar(file_path, cell_size):
             spine.set_color('white')
             spine.set_linewidth(0.5)
         fig.subplots_adjust(left=0.15, right=0.95, top=0.90, bottom=0.15)
-        
-        from matplotlib.backends.backend_agg import FigureCanvasAgg
-        canvas = FigureCanvasAgg(fig)
         canvas.draw()
-        buf = canvas.buffer_rgba()
-        arr = np.asarray(buf)[:, :, :3]
-        plt.close(fig)
+
+        # Wrap the Agg RGBA buffer directly and flatten it onto an opaque surface
+        width, height = canvas.get_width_height()
+        chrome = pygame.Surface((width, height))
+        chrome.blit(pygame.image.frombuffer(canvas.buffer_rgba(), (width, height), 'RGBA'), (0, 0))
+
+        # Second pass with only the spines and tick marks: the heatmap is
+        # pasted over the whole plot area and the anti-aliased frame goes back on top
+        for artist in (fig.patch, ax.patch, im, cbar.ax, ax.title, ax.xaxis.label, ax.yaxis.label):
+            artist.set_visible(False)
+        ax.tick_params(labelbottom=False, labelleft=False)
+        canvas.draw()
+        spines = pygame.image.frombuffer(canvas.buffer_rgba(), (width, height), 'RGBA').copy()
+
+    box = ax.get_window_extent()  # display pixels, origin bottom-left
+    left, right = int(round(box.x0)), int(round(box.x1))
+    top, bottom = height - int(round(box.y1)), height - int(round(box.y0))
+    # origin='lower': range 0 is the bottom row of the plot area
+    # Sample each bin at pixel centres, as imshow does for nearest upsampling
+    rows = ((np.arange(bottom - top) + 0.5) * (RADAR_R_BINS / (bottom - top))).astype(np.intp)
+    cols = ((np.arange(right - left) + 0.5) * (RADAR_V_BINS / (right - left))).astype(np.intp)
+    rows = rows[::-1]
+    return chrome, spines, (top, bottom, left, right), rows, cols
+
+
+def process_radar(file_path, cell_size):
+    try:
+        # Mapped read-only: the file is binned straight from the page cache
+        data = np.load(file_path, mmap_mode='r')
+        # Older collections saved zero-detection frames as a flat (0,) array
+        data = data.reshape(-1, 5)
+        # Create range-doppler map
+        v_bins = RADAR_V_BINS
+        r_bins = RADAR_R_BINS
+        max_range = RADAR_MAX_RANGE
+        max_velocity = RADAR_MAX_VELOCITY
+        # Bin every detection at once: keep the fractional cell positions
+        # that truncate inside the map (x in (-1, bins)), cast only those,
+        # then sum intensities per flattened cell.
+        depth, velocity, intensity = data[:, 0], data[:, 3], data[:, 4]
+        r_pos = (depth / max_range) * (r_bins - 1)
+        v_pos = ((velocity + max_velocity) / (2 * max_velocity)) * (v_bins - 1)
+        valid = (r_pos > -1) & (r_pos < r_bins) & (v_pos > -1) & (v_pos < v_bins)
+        intensity_matrix = np.bincount(
+            r_pos[valid].astype(np.int64) * v_bins + v_pos[valid].astype(np.int64),
+            weights=intensity[valid],
+            minlength=r_bins * v_bins,
+        ).astype(np.float64, copy=False).reshape(r_bins, v_bins)
+        # (bincount returns int64 when no detection lands in the map)
+        # dB conversion and LUT indexing run in place on the bincount output:
+        # 20*log10(I + 1e-10), then scaled onto [0, 255]
+        range_doppler = intensity_matrix
+        range_doppler += 1e-10
+        np.log10(range_doppler, out=range_doppler)
+        range_doppler *= 20
+        range_doppler -= RADAR_DB_MIN
+        range_doppler *= 256 / (RADAR_DB_MAX - RADAR_DB_MIN)
+        np.clip(range_doppler, 0, 255, out=range_doppler)
+        lut_idx = range_doppler.astype(np.uint8)
+
+        # Colorize through the jet LUT and paste into the cached figure,
+        # instead of building a matplotlib figure for every frame.
+        chrome, spines, (top, bottom, left, right), rows, cols = _radar_chrome(tuple(cell_size))
+        heatmap = _JET_LUT[lut_idx[rows[:, None], cols]]  # (H, W, 3), row-major
+        surface = chrome.copy()
+        surface.blit(pygame.image.frombuffer(heatmap, (right - left, bottom - top), 'RGB'), (left, top))
+        interior = pygame.Rect(left, top, right - left, bottom - top)
+        surface.blit(spines, interior, interior)
         # Avoid excessive scaling here to prevent pixelation
-        return pygame.surfarray.make_surface(arr.swapaxes(0, 1))
+        return surface
     except Exception as e:
         print(f"Error processing radar file {file_path.name}: {e}")
         return pygame.Surface(cell_size)
 
-def process_lidar(file_path, cell_size):
+# Half-width of the bird's-eye lidar view (m)
+LIDAR_RANGE = 100.0
+
+
+def _lidar_pixels(xy, cell_size):
+    """Map (N, 2) metric x/y to clipped int32 surfarray (x, y) pixels of cell_size.
+
+    The view is the (row, column) raster of the points rotated 90° to the
+    left, folded into the indices so no surface rotation is needed. One
+    scaled copy of xy is made; everything else runs in place on it.
+    """
+    width, height = cell_size
+    scale = min(width, height) / LIDAR_RANGE
+    px = xy * scale
+    # Center the data
+    px += (width/2, height/2)
+    # Invert the y-coordinates for correct orientation: height - y - 1
+    y = px[:, 1]
+    np.negative(y, out=y)
+    y += height
+    y -= 1
+    px = px.astype(np.int32)
+    np.clip(px, 0, (width-1, height-1), out=px)
+    # Rotating the raster 90° left keeps the column and mirrors the row
+    np.subtract(height - 1, px[:, 1], out=px[:, 1])
+    return px
+
+
+def make_lidar_canvas(cell_size):
+    """Reusable (pixel buffer, surface) pair for the lidar views of one sensor."""
+    width, height = cell_size
+    # surfarray indexes (x, y)
+    return np.zeros((width, height, 3), dtype=np.uint8), pygame.Surface((width, height))
+
+
+def process_lidar(file_path, cell_size, canvas=None):
     try:
-        points = np.load(file_path)
-        # Create a blank image for display
-        width, height = cell_size
-        lidar_range = 100.0
-        lidar_data = np.array(points[:, :2])
-        scale = min(width, height) / lidar_range
-        lidar_data = lidar_data * scale
-        # Center the data
-        lidar_data += (width/2, height/2)
-        # Invert the y-coordinates for correct orientation
-        lidar_data[:, 1] = height - lidar_data[:, 1] - 1
-        lidar_data = lidar_data.astype(np.int32)
-        lidar_data = np.clip(lidar_data, 0, [width-1, height-1])
-        lidar_img = np.zeros((height, width, 3), dtype=np.uint8)
-        lidar_img[lidar_data[:, 1], lidar_data[:, 0]] = (255, 255, 255)
-        surface = pygame.surfarray.make_surface(lidar_img)
-        # Rotate the surface 90° to the left
-        return pygame.transform.rotate(surface, 90)
+        # Mapped read-only: only the scaled x/y copy is materialized
+        points = np.load(file_path, mmap_mode='r')
+        # Clear the display buffer
+        if canvas is None:
+            canvas = make_lidar_canvas(cell_size)
+        lidar_img, surface = canvas
+        lidar_img.fill(0)
+        lidar_data = _lidar_pixels(points[:, :2], cell_size)
+        lidar_img[lidar_data[:, 0], lidar_data[:, 1]] = (255, 255, 255)
+        pygame.surfarray.blit_array(surface, lidar_img)
+        # The canvas is redrawn next frame: hand out a copy
+        return surface.copy()
     except Exception as e:
         print(f"Error processing lidar file {file_path.name}: {e}")
         return pygame.Surface(cell_size)
 
-def process_semantic_lidar(file_path, cell_size, semantic_colors):
+def process_semantic_lidar(file_path, cell_size, semantic_lut, canvas=None):
+    """semantic_lut: (256, 3) uint8 colour per semantic tag.
+    canvas: optional buffer/surface pair from make_lidar_canvas, reused across frames."""
     try:
-        # Load the semantic LIDAR data
-        points = np.load(file_path)
-        
-        # Create a blank image for display
-        width, height = cell_size
-        lidar_range = 100.0
+        # Load the semantic LIDAR data (mapped read-only, fields are copied out once)
+        points = np.load(file_path, mmap_mode='r')
         
-        # Extract XY coordinates and semantic tags
-        lidar_data = np.array(points[['x', 'y']].tolist())
+        # Extract XY coordinates and semantic tags, then scale, center and flip
+        lidar_data = _lidar_pixels(
+            np.stack((points['x'], points['y']), axis=1).astype(np.float64), cell_size)
         semantic_tags = points['semantic_tag']
         
-        # Scale and center the data
-        scale = min(width, height) / lidar_range
-        lidar_data = lidar_data * scale
-        lidar_data += (width/2, height/2)
+        # Clear the RGB buffer
+        if canvas is None:
+            canvas = make_lidar_canvas(cell_size)
+        lidar_img, surface = canvas
+        lidar_img.fill(0)
         
-        # Invert Y coordinates for correct orientation
-        lidar_data[:, 1] = height - lidar_data[:, 1] - 1
-        lidar_data = lidar_data.astype(np.int32)
-        lidar_data = np.clip(lidar_data, 0, [width-1, height-1])
+        # Plot points with semantic colors (tags past the table map to its
+        # last entry, which is white like any unknown tag)
+        colors = semantic_lut[np.minimum(semantic_tags, len(semantic_lut) - 1)]
+        lidar_img[lidar_data[:, 0], lidar_data[:, 1]] = colors
         
-        # Create RGB image
-        lidar_img = np.zeros((height, width, 3), dtype=np.uint8)
-        
-        # Plot points with semantic colors
-        for point_idx in range(len(lidar_data)):
-            x, y = lidar_data[point_idx]
-            tag = semantic_tags[point_idx]
-            color = semantic_colors.get(tag, (255, 255, 255))  # White for unknown tags
-            lidar_img[y, x] = color
-        
-        surface = pygame.surfarray.make_surface(lidar_img)
-        # Rotate the surface 90° to the left
-        return pygame.transform.rotate(surface, 90)
+        pygame.surfarray.blit_array(surface, lidar_img)
+        # The canvas is redrawn next frame: hand out a copy
+        return surface.copy()
         
     except Exception as e:
         print(f"Error processing semantic lidar file {file_path.name}: {e}")
         return pygame.Surface(cell_size)
 
-def process_imu(file_path, cell_size):
-    """Process IMU data for visualization"""
+@functools.lru_cache(maxsize=None)
+def _label(text, font_size, color):
+    """Render a static text line once; the surface is shared, only blit it."""
+    font = get_font(font_size)
+    with TEXT_LOCK:
+        return font.render(text, True, color)
+
+
+@functools.lru_cache(maxsize=FILE_CACHE_SIZE)
+def _text_panel(cell_size, lines, font_size):
+    """Render (text, size, color) lines centred on a black cell.
+
+    Cached on the exact strings shown, so readings that format identically
+    reuse the previous surface instead of re-rendering every line.
+    """
+    surface = pygame.Surface(cell_size)
+    surface.fill((0, 0, 0))  # Black background
+    title_size = font_size + 8
+    font = get_font(font_size)
+    
+    # Calculate total height and starting position
+    line_height = font_size + 4
+    total_height = len(lines) * line_height
+    start_y = (cell_size[1] - total_height) // 2
+    
+    # Render text
+    for i, (text, size, color) in enumerate(lines):
+        if text:  # Only render non-empty lines
+            if size == title_size:
+                # Titles never change: rendered once for the whole replay
+                text_surface = _label(text, size, color)
+            else:
+                with TEXT_LOCK:
+                    text_surface = font.render(text, True, color)
+            text_rect = text_surface.get_rect(center=(cell_size[0]/2, start_y + i * line_height))
+            surface.blit(text_surface, text_rect)
+    
+    return surface
+
+def process_imu(file_path, cell_size, data=None):
+    """Process IMU data for visualization; data may be passed in already parsed."""
     try:
-        with open(file_path) as f:
-            data = json.load(f)
-        
-        # Create a surface to display IMU data
-        surface = pygame.Surface(cell_size)
-        surface.fill((0, 0, 0))  # Black background
+        if data is None:
+            data = read_json(file_path)
         
         # Calculate font size based on cell height
         font_size = min(32, cell_size[1] // 12)
-        font = pygame.font.Font(None, font_size)
-        title_font = pygame.font.Font(None, font_size + 8)
+        title_size = font_size + 8
         
-        # Prepare text lines without tuples
-        lines = []
-        lines.append(("", font, (255, 255, 255)))
-        lines.append(("Accelerometer (m/s²)", title_font, (255, 255, 0)))
-        lines.append((f"X: {data['accelerometer']['x']:8.3f}, Y: {data['accelerometer']['y']:8.3f}, Z: {data['accelerometer']['z']:8.3f}", font, (255, 255, 255)))
-        lines.append(("", font, (255, 255, 255)))
-        lines.append(("Gyroscope (rad/s)", title_font, (255, 255, 0)))
-        lines.append((f"X: {data['gyroscope']['x']:8.3f}, Y: {data['gyroscope']['y']:8.3f}, Z: {data['gyroscope']['z']:8.3f}", font, (255, 255, 255)))
-        lines.append(("", font, (255, 255, 255)))
-        lines.append(("Compass", title_font, (255, 255, 0)))
-        lines.append((f"{data['compass']:5.1f}°", font, (255, 255, 255)))
-        
-        # Calculate total height and starting position
-        line_height = font_size + 4
-        total_height = len(lines) * line_height
-        start_y = (cell_size[1] - total_height) // 2
-        
-        # Render text
-        for i, (text, font_obj, color) in enumerate(lines):
-            if text:  # Only render non-empty lines
-                text_surface = font_obj.render(text, True, color)
-                text_rect = text_surface.get_rect(center=(cell_size[0]/2, start_y + i * line_height))
-                surface.blit(text_surface, text_rect)
-        
-        return surface
+        # Prepare text lines
+        lines = (
+            ("", font_size, (255, 255, 255)),
+            ("Accelerometer (m/s²)", title_size, (255, 255, 0)),
+            (f"X: {data['accelerometer']['x']:8.3f}, Y: {data['accelerometer']['y']:8.3f}, Z: {data['accelerometer']['z']:8.3f}", font_size, (255, 255, 255)),
+            ("", font_size, (255, 255, 255)),
+            ("Gyroscope (rad/s)", title_size, (255, 255, 0)),
+            (f"X: {data['gyroscope']['x']:8.3f}, Y: {data['gyroscope']['y']:8.3f}, Z: {data['gyroscope']['z']:8.3f}", font_size, (255, 255, 255)),
+            ("", font_size, (255, 255, 255)),
+            ("Compass", title_size, (255, 255, 0)),
+            (f"{data['compass']:5.1f}°", font_size, (255, 255, 255)),
+        )
+        return _text_panel(tuple(cell_size), lines, font_size)
         
     except Exception as e:
         print(f"Error processing IMU file {file_path}: {e}")
         return pygame.Surface(cell_size)
 
-def process_gnss(file_path, cell_size):
-    """Process GNSS data for visualization"""
+def process_gnss(file_path, cell_size, data=None):
+    """Process GNSS data for visualization; data may be passed in already parsed."""
     try:
-        with open(file_path) as f:
-            data = json.load(f)
-        
-        # Create a surface to display GNSS data
-        surface = pygame.Surface(cell_size)
-        surface.fill((0, 0, 0))  # Black background
+        if data is None:
+            data = read_json(file_path)
         
         # Use same font sizes as IMU
         font_size = min(32, cell_size[1] // 12)
-        font = pygame.font.Font(None, font_size)
-        title_font = pygame.font.Font(None, font_size + 8)
+        title_size = font_size + 8
         
         # Prepare text lines
-        lines = []
-        lines.append(("", font, (255, 255, 255)))
-        lines.append(("Position", title_font, (255, 255, 0)))
-        lines.append((f"Latitude:  {data['latitude']:11.6f}°", font, (255, 255, 255)))
-        lines.append((f"Longitude: {data['longitude']:11.6f}°", font, (255, 255, 255)))
-        lines.append((f"Altitude:  {data['altitude']:11.2f}m", font, (255, 255, 255)))
-        
-        # Calculate total height and starting position
-        line_height = font_size + 4
-        total_height = len(lines) * line_height
-        start_y = (cell_size[1] - total_height) // 2
-        
-        # Render text
-        for i, (text, font_obj, color) in enumerate(lines):
-            if text:  # Only render non-empty lines
-                text_surface = font_obj.render(text, True, color)
-                text_rect = text_surface.get_rect(center=(cell_size[0]/2, start_y + i * line_height))
-                surface.blit(text_surface, text_rect)
-        
-        return surface
+        lines = (
+            ("", font_size, (255, 255, 255)),
+            ("Position", title_size, (255, 255, 0)),
+            (f"Latitude:  {data['latitude']:11.6f}°", font_size, (255, 255, 255)),
+            (f"Longitude: {data['longitude']:11.6f}°", font_size, (255, 255, 255)),
+            (f"Altitude:  {data['altitude']:11.2f}m", font_size, (255, 255, 255)),
+        )
+        return _text_panel(tuple(cell_size), lines, font_size)
         
     except Exception as e:
         print(f"Error processing GNSS file {file_path}: {e}")
-        return pygame.Surface(cell_size)
\ No newline at end of file
+        return pygame.Surface(cell_size)